@@ -1,12 +1,17 @@
-from flask import Flask
+from flask import Flask, Response, request
 from flask_restx import Api, Resource, fields
 import requests
+import orjson
 from urllib.parse import quote
 import time
+import hashlib
 import logging
 import os
 import re
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, NamedTuple, Optional
+from lru import LRU
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -41,18 +46,33 @@ CACHE_TIMEOUT = 3600
 MAX_CACHE_SIZE = 1000
 # Request timeout in seconds
 REQUEST_TIMEOUT = 10
+# Connection pool sizing for the TVMaze session; TVMaze is a single host so
+# the per-host pool size is what bounds keep-alive reuse under load
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 100
+# Maximum number of actor names accepted by the batch endpoint
+MAX_BATCH_SIZE = 50
+# Worker threads used to fetch batch lookups concurrently
+BATCH_MAX_WORKERS = 16
+# TVMaze show types that are importable into Sonarr
+_ALLOWED_SHOW_TYPES = frozenset(
+    {"Scripted", "Reality", "Talk Show", "Game Show", "Documentary", "Animation"}
+)
+# Allowed characters for actor names
+_ACTOR_RE = re.compile(r"^[a-zA-Z0-9\s\-''.]+\Z")
 
 
 def setup_logging():
     """Set up logging configuration based on environment variable"""
     log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
 
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, log_level, logging.INFO),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        force=True,  # Force reconfiguration
-    )
+    # Configure the root logger only once, so re-imports in server worker
+    # processes don't clobber handlers that are already installed
+    if not logging.getLogger().hasHandlers():
+        logging.basicConfig(
+            level=getattr(logging, log_level, logging.INFO),
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        )
 
     logger = logging.getLogger(__name__)
     logger.setLevel(getattr(logging, log_level, logging.INFO))
@@ -62,9 +82,61 @@ def setup_logging():
 # Initialize logger
 logger = setup_logging()
 
-# Simple time-based cache
-_cache: Dict[str, List[Dict[str, str]]] = {}
-_cache_timestamps: Dict[str, float] = {}
+
+class CacheEntry(NamedTuple):
+    """Shows for an actor plus what is needed to revalidate them with TVMaze
+
+    body holds the shows pre-encoded as JSON and body_etag its content hash,
+    so cache hits can be served without serializing or hashing them again.
+    etag is TVMaze's validator for the cast credits, used for revalidation.
+    """
+
+    timestamp: float
+    shows: List[Dict[str, str]]
+    body: bytes
+    body_etag: str
+    person_id: Optional[int] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def new_cache_entry(
+    shows: List[Dict[str, str]],
+    person_id: Optional[int] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> CacheEntry:
+    """Create a fresh cache entry, encoding and hashing the shows once"""
+    body = orjson.dumps(shows)
+    return CacheEntry(
+        time.time(),
+        shows,
+        body,
+        hashlib.blake2b(body, digest_size=16).hexdigest(),
+        person_id,
+        etag,
+        last_modified,
+    )
+
+
+# Time-based LRU cache mapping actor name to CacheEntry; lookups promote
+# entries and inserts past MAX_CACHE_SIZE evict the oldest one. Expired
+# entries are kept until evicted so they can be revalidated.
+_cache: "LRU[str, CacheEntry]" = LRU(MAX_CACHE_SIZE)
+
+
+class _InFlightFetch:
+    """A TVMaze lookup in progress that concurrent cache misses wait on"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        # Stays None if the lookup fails
+        self.entry: Optional[CacheEntry] = None
+
+
+# Lookups in progress by cache key, so one fetch serves concurrent misses
+_inflight: Dict[str, _InFlightFetch] = {}
+_inflight_lock = threading.Lock()
 
 
 def create_session() -> requests.Session:
@@ -80,7 +152,12 @@ def create_session() -> requests.Session:
         raise_on_status=True,
     )
 
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=False,
+    )
     session.mount("http://", adapter)
     session.mount("https://", adapter)
 
@@ -90,13 +167,21 @@ def create_session() -> requests.Session:
 # Create a global session for reuse
 api_session = create_session()
 
+# Shared pool for fanning out batch lookups
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+
+
+def get_session() -> requests.Session:
+    """Return the shared session used for TVMaze requests"""
+    return api_session
+
 
 def validate_actor_name(actor_name: str) -> bool:
     """Validate actor name input"""
     if not actor_name or len(actor_name) > 100:
         return False
 
-    if not re.match(r"^[a-zA-Z0-9\s\-''.]+$", actor_name):
+    if not _ACTOR_RE.match(actor_name):
         return False
 
     return True
@@ -109,99 +194,197 @@ def normalize_actor_name(actor_name: str) -> str:
     return actor_name
 
 
-def evict_oldest_cache_entry():
-    """Remove the oldest cache entry"""
-    if _cache and _cache_timestamps:
-        oldest_key = min(_cache_timestamps, key=_cache_timestamps.get)
-        del _cache[oldest_key]
-        del _cache_timestamps[oldest_key]
-        logger.debug(f"Evicted oldest cache entry: {oldest_key}")
+def get_fresh_entry(cache_key: str) -> Optional[CacheEntry]:
+    """Return the unexpired cache entry for a cache key, if any"""
+    entry = _cache.get(cache_key)
+    if entry and time.time() - entry.timestamp < CACHE_TIMEOUT:
+        return entry
+    return None
+
+
+def get_cache_entry(actor_name: str) -> Optional[CacheEntry]:
+    """Fetch the cache entry for an actor, looking it up on TVMaze if needed
+
+    The actor name must already be lowercased. It is normalized before use
+    as the cache key, so spellings that resolve to the same TVMaze query
+    share one entry. Concurrent cache misses for the same actor are
+    coalesced into a single TVMaze lookup whose result is shared by all
+    waiting callers.
+
+    If the lookup fails, an expired entry for the actor is returned as-is.
+    Returns None if the lookup failed and nothing is cached; callers must
+    not treat that as a genuine empty result, since a person with no shows
+    yields an entry with an empty list.
+    """
+    cache_key = normalize_actor_name(actor_name)
+    entry = get_fresh_entry(cache_key)
+    if entry is not None:
+        logger.info("Cache hit for actor: %s", cache_key)
+        return entry
+
+    with _inflight_lock:
+        fetch = _inflight.get(cache_key)
+        if fetch is None:
+            # The previous lookup may have finished since the check above
+            entry = get_fresh_entry(cache_key)
+            if entry is not None:
+                logger.info("Cache hit for actor: %s", cache_key)
+                return entry
+            fetch = _inflight[cache_key] = _InFlightFetch()
+            is_leader = True
+        else:
+            is_leader = False
+
+    if not is_leader:
+        logger.info("Waiting for in-flight lookup for actor: %s", cache_key)
+        fetch.done.wait()
+        return fetch.entry
+
+    logger.info("Cache miss for actor: %s", cache_key)
+    try:
+        stale = _cache.get(cache_key)
+        entry = get_shows_entry_from_api(cache_key, stale)
+
+        # Don't let a transient TVMaze failure poison the cache for CACHE_TIMEOUT
+        if entry is not None:
+            _cache[cache_key] = entry
+            fetch.entry = entry
+        elif stale is not None:
+            # An expired list beats an empty one, which Sonarr may use to
+            # remove series; it stays expired so the next request retries
+            logger.warning("Serving stale shows for actor: %s", cache_key)
+            fetch.entry = stale
+    finally:
+        with _inflight_lock:
+            del _inflight[cache_key]
+        fetch.done.set()
+
+    return fetch.entry
 
 
 def get_shows_from_api_with_cache(actor_name: str) -> List[Dict[str, str]]:
-    """Fetch TV shows for an actor from TVMaze API with caching"""
-    cache_key = actor_name.lower()
-    if cache_key in _cache:
-        if time.time() - _cache_timestamps[cache_key] < CACHE_TIMEOUT:
-            logger.info(f"Cache hit for actor: {cache_key}")
-            return _cache[cache_key]
+    """Fetch TV shows for an actor from TVMaze API with caching
 
-    logger.info(f"Cache miss for actor: {cache_key}")
-    shows = get_shows_from_api(actor_name)
+    The actor name must already be lowercased; see get_cache_entry.
+    Returns an empty list if the lookup failed.
+    """
+    entry = get_cache_entry(actor_name)
+    return entry.shows if entry is not None else []
 
-    if len(_cache) >= MAX_CACHE_SIZE:
-        evict_oldest_cache_entry()
 
-    _cache[cache_key] = shows
-    _cache_timestamps[cache_key] = time.time()
+def get_shows_from_api(actor_name: str) -> Optional[List[Dict[str, str]]]:
+    """Fetch TV shows for an actor from TVMaze API
 
-    return shows
+    Returns an empty list if no matching person exists and None if the
+    lookup failed.
+    """
+    entry = get_shows_entry_from_api(actor_name)
+    return entry.shows if entry is not None else None
 
 
-def get_shows_from_api(actor_name: str) -> List[Dict[str, str]]:
-    """Fetch TV shows for an actor from TVMaze API"""
-    try:
-        normalized_name = normalize_actor_name(actor_name)
-        logger.debug(f"Searching for actor: {normalized_name} (original: {actor_name})")
-        url = f"https://api.tvmaze.com/search/people?q={quote(normalized_name)}"
-        response = api_session.get(url, timeout=REQUEST_TIMEOUT)
+def get_shows_entry_from_api(
+    actor_name: str, stale: Optional[CacheEntry] = None
+) -> Optional[CacheEntry]:
+    """Fetch TV shows for an actor from TVMaze API as a cache entry
 
-        people_data = response.json()
-        if not people_data:
-            logger.warning(f"No person found for actor: {actor_name}")
-            return []
-
-        person_id = people_data[0]["person"]["id"]
-        logger.debug(f"Found person ID: {person_id} for {actor_name}")
+    If an expired entry for a known person is given, the person search is
+    skipped and the cast credits are requested conditionally; on 304 Not
+    Modified the stale shows are reused with a fresh timestamp. If TVMaze
+    rejects the known person (e.g. deleted or merged), the person search is
+    repeated. Returns None if the lookup failed.
+    """
+    revalidating = stale is not None and stale.person_id is not None
+    try:
+        session = get_session()
+        headers: Dict[str, str] = {}
+
+        if stale is not None and stale.person_id is not None:
+            person_id = stale.person_id
+            if stale.etag:
+                headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                headers["If-Modified-Since"] = stale.last_modified
+            logger.debug("Revalidating cast credits for %s", actor_name)
+        else:
+            logger.debug("Searching for actor: %s", actor_name)
+            url = f"https://api.tvmaze.com/search/people?q={quote(actor_name)}"
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+            # 4xx responses other than 429 are not retried and come back as-is
+            response.raise_for_status()
+
+            people_data = orjson.loads(response.content)
+            if not people_data:
+                logger.warning("No person found for actor: %s", actor_name)
+                return new_cache_entry([])
+
+            person_id = people_data[0]["person"]["id"]
+            logger.debug("Found person ID: %s for %s", person_id, actor_name)
 
         credits_url = (
             f"https://api.tvmaze.com/people/{person_id}/castcredits?embed=show"
         )
-        logger.debug(f"Fetching cast credits from: {credits_url}")
-        credits_response = api_session.get(credits_url, timeout=REQUEST_TIMEOUT)
+        logger.debug("Fetching cast credits from: %s", credits_url)
+        credits_response = session.get(
+            credits_url, headers=headers, timeout=REQUEST_TIMEOUT
+        )
+        credits_response.raise_for_status()
+
+        if stale is not None and credits_response.status_code == 304:
+            logger.debug("Cast credits not modified for %s", actor_name)
+            return stale._replace(timestamp=time.time())
 
-        credits_data = credits_response.json()
+        credits_data = orjson.loads(credits_response.content)
 
-        shows = []
-        seen_tvdb_ids = set()
+        # Insertion-ordered dict doubles as the dedup set and the result order
+        tvdb_ids: Dict[str, None] = {}
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
 
         for credit in credits_data:
-            show = credit.get("_embedded", {}).get("show", {})
-            show_type = show.get("type", "")
-            show_name = show.get("name", "")
-
-            externals = show.get("externals", {})
-            tvdb_id = externals.get("thetvdb")
-
-            if tvdb_id and show_type in [
-                "Scripted",
-                "Reality",
-                "Talk Show",
-                "Game Show",
-                "Documentary",
-                "Animation",
-            ]:
-                tvdb_id_str = str(tvdb_id)
-                if tvdb_id_str not in seen_tvdb_ids:
-                    seen_tvdb_ids.add(tvdb_id_str)
-                    shows.append({"tvdbId": tvdb_id_str})
-                    logger.debug(f"Added show: {show_name} (TVDB: {tvdb_id_str})")
-
-        logger.debug(f"Found {len(shows)} TV shows with TVDB IDs for {actor_name}")
-        return shows
+            show = credit.get("_embedded", {}).get("show") or {}
+            if show.get("type") not in _ALLOWED_SHOW_TYPES:
+                continue
+
+            tvdb_id = (show.get("externals") or {}).get("thetvdb")
+            if not tvdb_id:
+                continue
+
+            tvdb_id_str = str(tvdb_id)
+            if tvdb_id_str in tvdb_ids:
+                continue
+
+            tvdb_ids[tvdb_id_str] = None
+            if debug_enabled:
+                logger.debug(
+                    "Added show: %s (TVDB: %s)", show.get("name", ""), tvdb_id_str
+                )
+
+        shows = [{"tvdbId": tvdb_id_str} for tvdb_id_str in tvdb_ids]
+        logger.debug("Found %d TV shows with TVDB IDs for %s", len(shows), actor_name)
+        return new_cache_entry(
+            shows,
+            person_id,
+            credits_response.headers.get("ETag"),
+            credits_response.headers.get("Last-Modified"),
+        )
 
     except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error fetching shows for {actor_name}: {str(e)}")
-        return []
+        status = e.response.status_code if e.response is not None else None
+        if revalidating and status is not None and 400 <= status < 500:
+            logger.warning(
+                "Cast credits for %s returned %s, searching again", actor_name, status
+            )
+            return get_shows_entry_from_api(actor_name)
+        logger.error("HTTP error fetching shows for %s: %s", actor_name, e)
+        return None
     except requests.exceptions.Timeout as e:
-        logger.error(f"Timeout fetching shows for {actor_name}: {str(e)}")
-        return []
+        logger.error("Timeout fetching shows for %s: %s", actor_name, e)
+        return None
     except requests.exceptions.RequestException as e:
-        logger.error(f"Request error fetching shows for {actor_name}: {str(e)}")
-        return []
+        logger.error("Request error fetching shows for %s: %s", actor_name, e)
+        return None
     except Exception as e:
-        logger.error(f"Unexpected error fetching shows for {actor_name}: {str(e)}")
-        return []
+        logger.error("Unexpected error fetching shows for %s: %s", actor_name, e)
+        return None
 
 
 @health_ns.route("")
@@ -213,11 +396,55 @@ class HealthCheck(Resource):
         return {"status": "healthy"}, 200
 
 
+@shows_ns.route("/batch")
+@shows_ns.param("names", "Comma-separated actor names to search for", _in="query")
+class ShowsBatch(Resource):
+    @api.doc("get_shows_batch")
+    @api.response(200, "Success")
+    @api.response(400, "Invalid actor names", error_model)
+    def get(self):
+        """Get TV shows for several actors at once
+
+        Returns an object mapping each lowercased actor name to its list of
+        TVDB IDs. Lookups for the individual actors run concurrently and
+        share the same cache as the single-actor endpoint.
+        """
+        raw_names = request.args.get("names", "")
+        logger.info("Batch request received for actors: %s", raw_names)
+
+        names = [name.strip() for name in raw_names.split(",") if name.strip()]
+        if not names or len(names) > MAX_BATCH_SIZE:
+            logger.warning("Invalid batch size: %d", len(names))
+            return {
+                "error": f"Invalid actor names. Provide 1-{MAX_BATCH_SIZE} comma-separated names."
+            }, 400
+
+        invalid_names = [name for name in names if not validate_actor_name(name)]
+        if invalid_names:
+            logger.warning("Invalid actor names in batch: %s", invalid_names)
+            return {
+                "error": "Invalid actor name. Must be 1-100 characters, alphanumeric with spaces, hyphens, apostrophes, and periods only."
+            }, 400
+
+        # Deduplicate case-insensitively while keeping the requested order
+        unique_names = list(dict.fromkeys(name.lower() for name in names))
+        results = dict(
+            zip(
+                unique_names,
+                _batch_executor.map(get_shows_from_api_with_cache, unique_names),
+            )
+        )
+
+        logger.info("Returning shows for %d actors", len(results))
+        return Response(orjson.dumps(results), mimetype="application/json")
+
+
 @shows_ns.route("/<string:actor_name>")
 @shows_ns.param("actor_name", "The name of the actor to search for")
 class ShowsByActor(Resource):
     @api.doc("get_shows_by_actor")
     @api.response(200, "Success", [show_model])
+    @api.response(304, "Not modified since the ETag sent in If-None-Match")
     @api.response(400, "Invalid actor name", error_model)
     @api.response(500, "Internal server error")
     def get(self, actor_name: str):
@@ -229,18 +456,45 @@ class ShowsByActor(Resource):
 
         The results are cached for 1 hour to reduce API calls to TVMaze.
         """
-        logger.info(f"Request received for actor: {actor_name}")
+        logger.info("Request received for actor: %s", actor_name)
 
         if not validate_actor_name(actor_name):
-            logger.warning(f"Invalid actor name: {actor_name}")
+            logger.warning("Invalid actor name: %s", actor_name)
             return {
                 "error": "Invalid actor name. Must be 1-100 characters, alphanumeric with spaces, hyphens, apostrophes, and periods only."
             }, 400
 
-        shows = get_shows_from_api_with_cache(actor_name)
-
-        logger.info(f"Returning {len(shows)} shows for {actor_name}")
-        return shows
+        actor_name_l = actor_name.lower()
+        entry = get_cache_entry(actor_name_l)
+
+        if entry is None:
+            # Never let clients or proxies hold on to an outage's empty list
+            logger.info("Returning uncacheable empty list for %s", actor_name_l)
+            return Response(
+                b"[]",
+                mimetype="application/json",
+                headers={"Cache-Control": "no-store"},
+            )
+
+        # Let Sonarr and any proxy in between reuse unchanged responses for
+        # as long as the cache entry itself stays fresh
+        etag = entry.body_etag
+        max_age = max(0, int(CACHE_TIMEOUT - (time.time() - entry.timestamp)))
+        headers = {"Cache-Control": f"public, max-age={max_age}"}
+        if request.if_none_match.contains_weak(etag):
+            logger.info("Returning not modified for %s", actor_name_l)
+            response = Response(status=304, headers=headers)
+        else:
+            logger.info(
+                "Returning %d bytes of shows for %s", len(entry.body), actor_name_l
+            )
+            # The body is encoded once per cache entry, bypassing Flask-RESTX's
+            # JSON representation
+            response = Response(
+                entry.body, mimetype="application/json", headers=headers
+            )
+        response.set_etag(etag)
+        return response
 
 
 if __name__ == "__main__":
@@ -1,48 +1,53 @@
 from unittest.mock import patch, Mock
-from app import get_shows_from_api
+from app import _cache, get_shows_from_api, get_shows_from_api_with_cache
+import orjson
+import requests
 
 
 def test_get_shows_from_api_success():
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [
-        {"person": {"id": 123, "name": "Bryan Cranston"}}
-    ]
+    mock_people_response.content = orjson.dumps(
+        [{"person": {"id": 123, "name": "Bryan Cranston"}}]
+    )
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "id": 169,
-                    "name": "Breaking Bad",
-                    "type": "Scripted",
-                    "genres": ["Drama", "Crime", "Thriller"],
-                    "externals": {
-                        "tvrage": 18164,
-                        "thetvdb": 81189,
-                        "imdb": "tt0903747",
-                    },
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "id": 169,
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "genres": ["Drama", "Crime", "Thriller"],
+                        "externals": {
+                            "tvrage": 18164,
+                            "thetvdb": 81189,
+                            "imdb": "tt0903747",
+                        },
+                    }
                 }
-            }
-        },
-        {
-            "_embedded": {
-                "show": {
-                    "id": 249,
-                    "name": "Malcolm in the Middle",
-                    "type": "Scripted",
-                    "genres": ["Comedy", "Family"],
-                    "externals": {
-                        "tvrage": 3838,
-                        "thetvdb": 73838,
-                        "imdb": "tt0212671",
-                    },
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "id": 249,
+                        "name": "Malcolm in the Middle",
+                        "type": "Scripted",
+                        "genres": ["Comedy", "Family"],
+                        "externals": {
+                            "tvrage": 3838,
+                            "thetvdb": 73838,
+                            "imdb": "tt0212671",
+                        },
+                    }
                 }
-            }
-        },
-    ]
+            },
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
@@ -57,39 +62,42 @@ def test_get_shows_from_api_success():
 def test_get_shows_from_api_filters_tv_shows_only():
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Breaking Bad",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 81189},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
                 }
-            }
-        },
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Godzilla",
-                    "type": "Movie",
-                    "externals": {"thetvdb": 999999},
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Godzilla",
+                        "type": "Movie",
+                        "externals": {"thetvdb": 999999},
+                    }
                 }
-            }
-        },
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Better Call Saul",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 273181},
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Better Call Saul",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 273181},
+                    }
                 }
-            }
-        },
-    ]
+            },
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
@@ -103,7 +111,7 @@ def test_get_shows_from_api_filters_tv_shows_only():
 def test_get_shows_from_api_handles_empty_results():
     mock_response = Mock()
     mock_response.status_code = 200
-    mock_response.json.return_value = []
+    mock_response.content = orjson.dumps([])
 
     with patch("app.api_session.get", return_value=mock_response):
         result = get_shows_from_api("Unknown Actor")
@@ -118,22 +126,46 @@ def test_get_shows_from_api_handles_api_error():
     with patch("app.api_session.get", return_value=mock_response):
         result = get_shows_from_api("Bryan Cranston")
 
-        assert result == []
+        assert result is None
+
+
+def test_get_shows_from_api_handles_credits_client_error():
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    credits_response = requests.Response()
+    credits_response.status_code = 404
+    credits_response.reason = "Not Found"
+    credits_response.url = "https://api.tvmaze.com/people/123/castcredits?embed=show"
+    credits_response._content = b'{"name":"Not Found","status":404}'
+
+    with patch("app.logger") as mock_logger:
+        with patch("app.api_session.get") as mock_get:
+            mock_get.side_effect = [mock_people_response, credits_response]
+            result = get_shows_from_api("Bryan Cranston")
+
+            assert result is None
+            assert mock_get.call_count == 2
+            assert mock_logger.error.call_args[0][:2] == (
+                "HTTP error fetching shows for %s: %s",
+                "Bryan Cranston",
+            )
 
 
 def test_get_shows_from_api_handles_network_error():
     with patch("app.api_session.get", side_effect=Exception("Network error")):
         result = get_shows_from_api("Bryan Cranston")
 
-        assert result == []
+        assert result is None
 
 
 def test_get_shows_from_api_handles_no_person_found():
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = []
+    mock_people_response.content = orjson.dumps([])
 
-    with patch("requests.get", return_value=mock_people_response):
+    with patch("app.api_session.get", return_value=mock_people_response):
         result = get_shows_from_api("Nonexistent Person")
 
         assert result == []
@@ -143,18 +175,21 @@ def test_actor_name_normalization():
     """Test that actor names are normalized correctly for API calls"""
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [
-        {"person": {"id": 123, "name": "Bryan Cranston"}}
-    ]
+    mock_people_response.content = orjson.dumps(
+        [{"person": {"id": 123, "name": "Bryan Cranston"}}]
+    )
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = []
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps([])
+
+    _cache.clear()
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
 
-        get_shows_from_api("bryan-cranston")
+        get_shows_from_api_with_cache("bryan-cranston")
 
         first_call = mock_get.call_args_list[0]
         assert "bryan%20cranston" in first_call[0][0]
@@ -163,38 +198,41 @@ def test_actor_name_normalization():
 def test_get_shows_from_api_handles_missing_tvdb_id():
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Breaking Bad",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 81189},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
                 }
-            }
-        },
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Show Without TVDB",
-                    "type": "Scripted",
-                    "externals": {"imdb": "tt1234567"},
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Show Without TVDB",
+                        "type": "Scripted",
+                        "externals": {"imdb": "tt1234567"},
+                    }
                 }
-            }
-        },
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Show Without Externals",
-                    "type": "Scripted",
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Show Without Externals",
+                        "type": "Scripted",
+                    }
                 }
-            }
-        },
-    ]
+            },
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
@@ -202,3 +240,66 @@ def test_get_shows_from_api_handles_missing_tvdb_id():
 
         expected = [{"tvdbId": "81189"}]
         assert result == expected
+
+
+def test_get_shows_from_api_deduplicates_tvdb_ids():
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
+                }
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Malcolm in the Middle",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 73838},
+                    }
+                }
+            },
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
+                }
+            },
+            {"_embedded": {"show": None}},
+        ]
+    )
+
+    with patch("app.api_session.get") as mock_get:
+        mock_get.side_effect = [mock_people_response, mock_credits_response]
+        result = get_shows_from_api("Bryan Cranston")
+
+        assert result == [{"tvdbId": "81189"}, {"tvdbId": "73838"}]
+
+
+def test_get_shows_from_api_uses_injected_session():
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([])
+
+    fake_session = Mock()
+    fake_session.get.return_value = mock_people_response
+
+    with patch("app.get_session", return_value=fake_session):
+        result = get_shows_from_api("Injected Actor")
+
+        assert result == []
+        assert fake_session.get.call_count == 1
@@ -1,6 +1,7 @@
 import pytest
+import time
 from unittest.mock import patch
-from app import app
+from app import app, new_cache_entry
 
 
 @pytest.fixture
@@ -16,16 +17,16 @@ def test_shows_endpoint_exists(client):
 
 
 def test_shows_endpoint_returns_json(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [{"tvdbId": "81189"}]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "81189"}])
 
         response = client.get("/shows/bryan-cranston")
         assert response.content_type == "application/json"
 
 
 def test_shows_endpoint_returns_list(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [{"tvdbId": "81189"}]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "81189"}])
 
         response = client.get("/shows/bryan-cranston")
         data = response.get_json()
@@ -33,12 +34,14 @@ def test_shows_endpoint_returns_list(client):
 
 
 def test_bryan_cranston_shows(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [
-            {"tvdbId": "81189"},  # Breaking Bad
-            {"tvdbId": "73838"},  # Malcolm in the Middle
-            {"tvdbId": "366811"},  # Your Honor
-        ]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry(
+            [
+                {"tvdbId": "81189"},  # Breaking Bad
+                {"tvdbId": "73838"},  # Malcolm in the Middle
+                {"tvdbId": "366811"},  # Your Honor
+            ]
+        )
 
         response = client.get("/shows/bryan-cranston")
         data = response.get_json()
@@ -51,8 +54,8 @@ def test_bryan_cranston_shows(client):
 
 
 def test_unknown_actor_returns_empty_list(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = []
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([])
 
         response = client.get("/shows/unknown-actor")
         data = response.get_json()
@@ -62,12 +65,14 @@ def test_unknown_actor_returns_empty_list(client):
 
 
 def test_actor_name_case_insensitive(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [
-            {"tvdbId": "73244"},  # The Office
-            {"tvdbId": "359260"},  # The Morning Show
-            {"tvdbId": "377513"},  # Space Force
-        ]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry(
+            [
+                {"tvdbId": "73244"},  # The Office
+                {"tvdbId": "359260"},  # The Morning Show
+                {"tvdbId": "377513"},  # Space Force
+            ]
+        )
 
         response_lower = client.get("/shows/steve-carell")
         response_upper = client.get("/shows/STEVE-CARELL")
@@ -84,16 +89,20 @@ def test_actor_name_case_insensitive(client):
         assert response_upper.get_json() == expected
         assert response_mixed.get_json() == expected
 
-        # Check all variations were called
+        # Check all variations were called with the same lowercased key
         assert mock_cache.call_count == 3
+        for call_args in mock_cache.call_args_list:
+            assert call_args[0] == ("steve-carell",)
 
 
 def test_shows_endpoint_uses_api_for_all_actors(client):
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [
-            {"tvdbId": "311714"},  # The Good Place
-            {"tvdbId": "77623"},  # Cheers
-        ]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry(
+            [
+                {"tvdbId": "311714"},  # The Good Place
+                {"tvdbId": "77623"},  # Cheers
+            ]
+        )
 
         response = client.get("/shows/ted-danson")
         data = response.get_json()
@@ -133,8 +142,8 @@ def test_invalid_actor_name_empty(client):
 
 def test_valid_actor_names_with_allowed_characters(client):
     """Test that actor names with apostrophes, hyphens, and periods are accepted"""
-    with patch("app.get_shows_from_api_with_cache") as mock_cache:
-        mock_cache.return_value = [{"tvdbId": "123456"}]
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "123456"}])
 
         # Test various valid names
         valid_names = [
@@ -150,3 +159,120 @@ def test_valid_actor_names_with_allowed_characters(client):
             assert response.status_code == 200
             data = response.get_json()
             assert isinstance(data, list)
+
+
+def test_shows_endpoint_sets_cache_headers(client):
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "81189"}])
+
+        response = client.get("/shows/bryan-cranston")
+
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] in (
+            "public, max-age=3600",
+            "public, max-age=3599",
+        )
+        assert response.headers["ETag"]
+
+
+def test_shows_endpoint_max_age_is_remaining_ttl(client):
+    with patch("app.get_cache_entry") as mock_cache:
+        entry = new_cache_entry([{"tvdbId": "81189"}])
+        mock_cache.return_value = entry._replace(timestamp=time.time() - 3540)
+
+        response = client.get("/shows/bryan-cranston")
+        max_age = int(response.headers["Cache-Control"].split("max-age=")[1])
+
+        assert 58 <= max_age <= 60
+
+        mock_cache.return_value = entry._replace(timestamp=time.time() - 7200)
+        response = client.get("/shows/bryan-cranston")
+
+        assert response.headers["Cache-Control"] == "public, max-age=0"
+
+
+def test_shows_endpoint_failed_lookup_is_not_cacheable(client):
+    with patch("app.get_cache_entry", return_value=None):
+        response = client.get("/shows/bryan-cranston")
+
+        assert response.status_code == 200
+        assert response.get_json() == []
+        assert response.headers["Cache-Control"] == "no-store"
+        assert "ETag" not in response.headers
+
+
+def test_shows_endpoint_returns_not_modified_for_matching_etag(client):
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "81189"}])
+
+        etag = client.get("/shows/bryan-cranston").headers["ETag"]
+        response = client.get("/shows/bryan-cranston", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "73838"}])
+        response = client.get("/shows/bryan-cranston", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.get_json() == [{"tvdbId": "73838"}]
+
+
+def test_shows_endpoint_accepts_weak_etag(client):
+    with patch("app.get_cache_entry") as mock_cache:
+        mock_cache.return_value = new_cache_entry([{"tvdbId": "81189"}])
+
+        etag = client.get("/shows/bryan-cranston").headers["ETag"]
+        response = client.get(
+            "/shows/bryan-cranston", headers={"If-None-Match": f"W/{etag}"}
+        )
+
+        assert response.status_code == 304
+        assert response.data == b""
+
+
+def test_batch_endpoint_returns_shows_per_actor(client):
+    with patch("app.get_shows_from_api_with_cache") as mock_cache:
+        mock_cache.side_effect = lambda name: [{"tvdbId": f"{name}-id"}]
+
+        response = client.get("/shows/batch?names=bryan-cranston,Ted Danson")
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {
+            "bryan-cranston": [{"tvdbId": "bryan-cranston-id"}],
+            "ted danson": [{"tvdbId": "ted danson-id"}],
+        }
+
+
+def test_batch_endpoint_deduplicates_names(client):
+    with patch("app.get_shows_from_api_with_cache") as mock_cache:
+        mock_cache.return_value = [{"tvdbId": "81189"}]
+
+        response = client.get("/shows/batch?names=bryan-cranston,BRYAN-CRANSTON,")
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data == {"bryan-cranston": [{"tvdbId": "81189"}]}
+        mock_cache.assert_called_once_with("bryan-cranston")
+
+
+def test_batch_endpoint_rejects_invalid_names(client):
+    with patch("app.get_shows_from_api_with_cache") as mock_cache:
+        response = client.get("/shows/batch?names=bryan-cranston,actor@example.com")
+        data = response.get_json()
+
+        assert response.status_code == 400
+        assert "Invalid actor name" in data["error"]
+        mock_cache.assert_not_called()
+
+
+def test_batch_endpoint_requires_names(client):
+    response = client.get("/shows/batch")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+    too_many = ",".join(f"actor {i}" for i in range(51))
+    response = client.get(f"/shows/batch?names={too_many}")
+    assert response.status_code == 400
@@ -1,7 +1,10 @@
 import pytest
 from unittest.mock import patch, Mock
+import threading
 import time
-from app import app, get_shows_from_api_with_cache
+from app import app, get_shows_from_api_with_cache, new_cache_entry, MAX_CACHE_SIZE
+import orjson
+import requests
 
 
 @pytest.fixture
@@ -12,39 +15,41 @@ def client():
 
 
 def test_cache_prevents_repeated_api_calls():
-    from app import _cache, _cache_timestamps
+    from app import _cache
 
     _cache.clear()
-    _cache_timestamps.clear()
 
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Breaking Bad",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 81189},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
 
-        result1 = get_shows_from_api_with_cache("Bryan Cranston")
+        result1 = get_shows_from_api_with_cache("bryan cranston")
         assert result1 == [{"tvdbId": "81189"}]
         assert mock_get.call_count == 2
 
         mock_get.reset_mock()
 
-        result2 = get_shows_from_api_with_cache("Bryan Cranston")
+        result2 = get_shows_from_api_with_cache("bryan cranston")
         assert result2 == [{"tvdbId": "81189"}]
         assert mock_get.call_count == 0
 
@@ -52,122 +57,449 @@ def test_cache_prevents_repeated_api_calls():
 def test_cache_expires_after_timeout():
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Breaking Bad",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 81189},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         with patch("app.CACHE_TIMEOUT", 0.1):
             mock_get.side_effect = [mock_people_response, mock_credits_response]
 
-            get_shows_from_api_with_cache("Test Actor")
+            get_shows_from_api_with_cache("test actor")
             assert mock_get.call_count == 2
 
             time.sleep(0.2)
 
             mock_get.reset_mock()
+            mock_get.side_effect = [mock_credits_response]
+
+            # The known person is reused, so only the cast credits are refetched
+            get_shows_from_api_with_cache("test actor")
+            assert mock_get.call_count == 1
+            assert "/people/123/castcredits" in mock_get.call_args[0][0]
+
+
+def test_expired_entry_revalidated_with_etag():
+    from app import _cache
+
+    _cache.clear()
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {
+        "ETag": '"abc123"',
+        "Last-Modified": "Tue, 13 Oct 2026 10:00:00 GMT",
+    }
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
+                }
+            }
+        ]
+    )
+
+    mock_not_modified_response = Mock()
+    mock_not_modified_response.status_code = 304
+    mock_not_modified_response.content = b""
+
+    with patch("app.api_session.get") as mock_get:
+        with patch("app.CACHE_TIMEOUT", 0.1):
             mock_get.side_effect = [mock_people_response, mock_credits_response]
+            result1 = get_shows_from_api_with_cache("etag actor")
+            before = _cache["etag actor"]
 
-            get_shows_from_api_with_cache("Test Actor")
-            assert mock_get.call_count == 2
+            time.sleep(0.2)
+
+            mock_get.reset_mock()
+            mock_get.side_effect = [mock_not_modified_response]
+            result2 = get_shows_from_api_with_cache("etag actor")
+
+            assert result1 == result2 == [{"tvdbId": "81189"}]
+            assert mock_get.call_count == 1
+            assert mock_get.call_args[1]["headers"] == {
+                "If-None-Match": '"abc123"',
+                "If-Modified-Since": "Tue, 13 Oct 2026 10:00:00 GMT",
+            }
 
+            after = _cache["etag actor"]
+            assert after.body is before.body
+            assert after.body_etag == before.body_etag
 
-def test_case_insensitive_caching():
+        # The 304 refreshed the entry, so it is fresh again
+        mock_get.reset_mock()
+        assert get_shows_from_api_with_cache("etag actor") == result1
+        assert mock_get.call_count == 0
+
+
+def test_case_insensitive_caching(client):
     """Test that cache is case-insensitive"""
-    from app import _cache, _cache_timestamps, get_shows_from_api_with_cache
+    from app import _cache
 
     _cache.clear()
-    _cache_timestamps.clear()
 
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 456}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 456}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Action Show",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 99999},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Action Show",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 99999},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response, mock_credits_response]
 
-        result1 = get_shows_from_api_with_cache("Bryan Cranston")
+        result1 = client.get("/shows/Bryan Cranston").get_json()
         assert mock_get.call_count == 2
 
         mock_get.reset_mock()
 
-        result2 = get_shows_from_api_with_cache("BRYAN CRANSTON")
+        result2 = client.get("/shows/BRYAN CRANSTON").get_json()
         assert mock_get.call_count == 0
 
         assert result1 == result2
         assert result1 == [{"tvdbId": "99999"}]
 
 
+def test_hyphenated_and_spaced_names_share_cache_entry():
+    from app import _cache
+
+    _cache.clear()
+
+    with patch("app.get_shows_entry_from_api") as mock_api:
+        mock_api.return_value = new_cache_entry([{"tvdbId": "81189"}])
+
+        result1 = get_shows_from_api_with_cache("bryan-cranston")
+        result2 = get_shows_from_api_with_cache("bryan cranston")
+
+        assert result1 == result2 == [{"tvdbId": "81189"}]
+        mock_api.assert_called_once_with("bryan cranston", None)
+        assert list(_cache.keys()) == ["bryan cranston"]
+
+
+def test_stale_entry_served_when_revalidation_fails():
+    from app import _cache
+
+    _cache.clear()
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
+                }
+            }
+        ]
+    )
+
+    with patch("app.api_session.get") as mock_get:
+        with patch("app.CACHE_TIMEOUT", 0.1):
+            mock_get.side_effect = [mock_people_response, mock_credits_response]
+            get_shows_from_api_with_cache("stale actor")
+            stale = _cache["stale actor"]
+
+            time.sleep(0.2)
+
+            mock_get.reset_mock()
+            mock_get.side_effect = Exception("Network error")
+            with patch("app.logger") as mock_logger:
+                result = get_shows_from_api_with_cache("stale actor")
+
+            assert result == [{"tvdbId": "81189"}]
+            assert mock_get.call_count == 1
+            assert "/people/123/castcredits" in mock_get.call_args[0][0]
+            mock_logger.warning.assert_called_with(
+                "Serving stale shows for actor: %s", "stale actor"
+            )
+            # The stale entry is not refreshed, so the next request retries
+            assert _cache["stale actor"] is stale
+
+
+def test_revalidation_searches_again_when_person_is_gone():
+    from app import _cache
+
+    _cache.clear()
+    _cache["gone actor"] = new_cache_entry(
+        [{"tvdbId": "81189"}], person_id=123, etag='"abc123"'
+    )._replace(timestamp=0)
+
+    mock_gone_response = requests.Response()
+    mock_gone_response.status_code = 404
+    mock_gone_response.url = "https://api.tvmaze.com/people/123/castcredits"
+    mock_gone_response._content = b'{"name":"Not Found","status":404}'
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 456}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Malcolm in the Middle",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 73838},
+                    }
+                }
+            }
+        ]
+    )
+
+    with patch("app.api_session.get") as mock_get:
+        mock_get.side_effect = [
+            mock_gone_response,
+            mock_people_response,
+            mock_credits_response,
+        ]
+        result = get_shows_from_api_with_cache("gone actor")
+
+    assert result == [{"tvdbId": "73838"}]
+    assert mock_get.call_count == 3
+    assert "/people/123/castcredits" in mock_get.call_args_list[0][0][0]
+    assert "search/people" in mock_get.call_args_list[1][0][0]
+    assert "/people/456/castcredits" in mock_get.call_args_list[2][0][0]
+    # The new person is requested unconditionally
+    assert mock_get.call_args_list[2][1]["headers"] == {}
+    assert _cache["gone actor"].person_id == 456
+
+
+def test_cached_body_is_encoded_once():
+    from app import _cache, get_cache_entry
+
+    _cache.clear()
+
+    with patch("app.get_shows_entry_from_api") as mock_api:
+        mock_api.return_value = new_cache_entry([{"tvdbId": "81189"}])
+
+        body1 = get_cache_entry("body actor").body
+        body2 = get_cache_entry("body actor").body
+
+        assert orjson.loads(body1) == [{"tvdbId": "81189"}]
+        assert body1 is body2
+        assert get_cache_entry("body actor").body_etag == (
+            new_cache_entry([{"tvdbId": "81189"}]).body_etag
+        )
+        assert mock_api.call_count == 1
+
+
 def test_different_actors_cached_separately():
     mock_people_response1 = Mock()
     mock_people_response1.status_code = 200
-    mock_people_response1.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response1.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response1 = Mock()
     mock_credits_response1.status_code = 200
-    mock_credits_response1.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Show 1",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 111111},
+    mock_credits_response1.headers = {}
+    mock_credits_response1.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Show 1",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 111111},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     mock_people_response2 = Mock()
     mock_people_response2.status_code = 200
-    mock_people_response2.json.return_value = [{"person": {"id": 456}}]
+    mock_people_response2.content = orjson.dumps([{"person": {"id": 456}}])
 
     mock_credits_response2 = Mock()
     mock_credits_response2.status_code = 200
-    mock_credits_response2.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Show 2",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 222222},
+    mock_credits_response2.headers = {}
+    mock_credits_response2.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Show 2",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 222222},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     with patch("app.api_session.get") as mock_get:
         mock_get.side_effect = [mock_people_response1, mock_credits_response1]
-        result1 = get_shows_from_api_with_cache("Actor 1")
+        result1 = get_shows_from_api_with_cache("actor 1")
         assert result1 == [{"tvdbId": "111111"}]
 
         mock_get.side_effect = [mock_people_response2, mock_credits_response2]
-        result2 = get_shows_from_api_with_cache("Actor 2")
+        result2 = get_shows_from_api_with_cache("actor 2")
         assert result2 == [{"tvdbId": "222222"}]
 
         assert mock_get.call_count == 4
+
+
+def test_failed_lookups_are_not_cached():
+    from app import _cache
+
+    _cache.clear()
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Breaking Bad",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 81189},
+                    }
+                }
+            }
+        ]
+    )
+
+    with patch("app.api_session.get") as mock_get:
+        mock_get.side_effect = Exception("Network error")
+
+        result1 = get_shows_from_api_with_cache("flaky actor")
+        assert result1 == []
+        assert "flaky actor" not in _cache
+
+        mock_get.side_effect = [mock_people_response, mock_credits_response]
+
+        result2 = get_shows_from_api_with_cache("flaky actor")
+        assert result2 == [{"tvdbId": "81189"}]
+        assert mock_get.call_count == 3
+
+
+def test_cache_entry_distinguishes_failure_from_no_person():
+    from app import _cache, get_cache_entry
+
+    _cache.clear()
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([])
+
+    with patch("app.api_session.get") as mock_get:
+        mock_get.side_effect = Exception("Network error")
+        assert get_cache_entry("failing actor") is None
+
+        mock_get.side_effect = [mock_people_response]
+        entry = get_cache_entry("nobody actor")
+        assert entry is not None
+        assert entry.shows == []
+
+
+def test_cache_evicts_least_recently_used_entry():
+    from app import _cache
+
+    _cache.clear()
+
+    _cache.set_size(2)
+    try:
+        with patch("app.get_shows_entry_from_api") as mock_api:
+            mock_api.side_effect = lambda name, stale: new_cache_entry([])
+
+            get_shows_from_api_with_cache("actor a")
+            get_shows_from_api_with_cache("actor b")
+            get_shows_from_api_with_cache("actor a")
+            get_shows_from_api_with_cache("actor c")
+
+            assert sorted(_cache.keys()) == ["actor a", "actor c"]
+            assert mock_api.call_count == 3
+    finally:
+        _cache.set_size(MAX_CACHE_SIZE)
+
+
+def test_concurrent_cache_misses_share_one_lookup():
+    from app import _cache, _inflight
+
+    _cache.clear()
+    release = threading.Event()
+
+    def slow_lookup(actor_name, stale):
+        release.wait(timeout=5)
+        return new_cache_entry([{"tvdbId": "81189"}])
+
+    with patch("app.get_shows_entry_from_api", side_effect=slow_lookup) as mock_api:
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    get_shows_from_api_with_cache("popular actor")
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+
+        while "popular actor" not in _inflight:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+
+        for thread in threads:
+            thread.join(timeout=5)
+
+        assert mock_api.call_count == 1
+        assert results == [[{"tvdbId": "81189"}]] * 5
+        assert "popular actor" not in _inflight
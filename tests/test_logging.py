@@ -2,7 +2,8 @@ import pytest
 from unittest.mock import patch, Mock
 import logging
 import os
-from app import app, get_shows_from_api_with_cache, setup_logging
+from app import app, get_shows_from_api_with_cache, new_cache_entry, setup_logging
+import orjson
 
 
 @pytest.fixture
@@ -32,29 +33,43 @@ def test_logging_defaults_to_info():
         assert logger.level == logging.INFO
 
 
+def test_logging_setup_keeps_existing_root_handlers():
+    root = logging.getLogger()
+    handler = logging.NullHandler()
+    root.addHandler(handler)
+    try:
+        handlers_before = list(root.handlers)
+        setup_logging()
+        assert root.handlers == handlers_before
+    finally:
+        root.removeHandler(handler)
+
+
 def test_debug_logging_for_api_calls():
-    from app import _cache, _cache_timestamps
+    from app import _cache
 
     _cache.clear()
-    _cache_timestamps.clear()
 
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = [
-        {
-            "_embedded": {
-                "show": {
-                    "name": "Test Show",
-                    "type": "Scripted",
-                    "externals": {"thetvdb": 12345},
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Test Show",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 12345},
+                    }
                 }
             }
-        }
-    ]
+        ]
+    )
 
     with patch.dict(os.environ, {"LOG_LEVEL": "DEBUG"}):
         setup_logging()
@@ -65,27 +80,64 @@ def test_debug_logging_for_api_calls():
                 get_shows_from_api_with_cache("Test Actor Debug")
 
                 mock_logger.debug.assert_any_call(
-                    "Searching for actor: Test Actor Debug (original: Test Actor Debug)"
+                    "Searching for actor: %s", "Test Actor Debug"
                 )
                 mock_logger.debug.assert_any_call(
-                    "Found person ID: 123 for Test Actor Debug"
+                    "Found person ID: %s for %s", 123, "Test Actor Debug"
                 )
                 assert mock_logger.debug.call_count >= 4
 
 
+def test_show_debug_logging_skipped_when_debug_disabled():
+    from app import get_shows_from_api
+
+    mock_people_response = Mock()
+    mock_people_response.status_code = 200
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
+
+    mock_credits_response = Mock()
+    mock_credits_response.status_code = 200
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps(
+        [
+            {
+                "_embedded": {
+                    "show": {
+                        "name": "Test Show",
+                        "type": "Scripted",
+                        "externals": {"thetvdb": 12345},
+                    }
+                }
+            }
+        ]
+    )
+
+    with patch("app.logger") as mock_logger:
+        mock_logger.isEnabledFor.return_value = False
+        with patch("app.api_session.get") as mock_get:
+            mock_get.side_effect = [mock_people_response, mock_credits_response]
+            result = get_shows_from_api("Test Actor Info")
+
+            assert result == [{"tvdbId": "12345"}]
+            assert not any(
+                "Added show" in str(call_args)
+                for call_args in mock_logger.debug.call_args_list
+            )
+
+
 def test_info_logging_for_cache_operations():
-    from app import _cache, _cache_timestamps
+    from app import _cache
 
     _cache.clear()
-    _cache_timestamps.clear()
 
     mock_people_response = Mock()
     mock_people_response.status_code = 200
-    mock_people_response.json.return_value = [{"person": {"id": 123}}]
+    mock_people_response.content = orjson.dumps([{"person": {"id": 123}}])
 
     mock_credits_response = Mock()
     mock_credits_response.status_code = 200
-    mock_credits_response.json.return_value = []
+    mock_credits_response.headers = {}
+    mock_credits_response.content = orjson.dumps([])
 
     with patch.dict(os.environ, {"LOG_LEVEL": "INFO"}):
         setup_logging()
@@ -94,15 +146,17 @@ def test_info_logging_for_cache_operations():
             with patch("app.api_session.get") as mock_get:
                 mock_get.side_effect = [mock_people_response, mock_credits_response]
 
-                get_shows_from_api_with_cache("Cached Actor")
+                get_shows_from_api_with_cache("cached actor")
                 mock_logger.info.assert_called_with(
-                    "Cache miss for actor: cached actor"
+                    "Cache miss for actor: %s", "cached actor"
                 )
 
                 mock_logger.reset_mock()
 
-                get_shows_from_api_with_cache("Cached Actor")
-                mock_logger.info.assert_called_with("Cache hit for actor: cached actor")
+                get_shows_from_api_with_cache("cached actor")
+                mock_logger.info.assert_called_with(
+                    "Cache hit for actor: %s", "cached actor"
+                )
 
 
 def test_error_logging_for_api_failures():
@@ -114,42 +168,46 @@ def test_error_logging_for_api_failures():
                 result = get_shows_from_api_with_cache("Error Actor")
 
                 assert result == []
-                mock_logger.error.assert_called_with(
-                    "Unexpected error fetching shows for Error Actor: Network error"
+                message, *args = mock_logger.error.call_args[0]
+                assert (
+                    message % tuple(args)
+                    == "Unexpected error fetching shows for Error Actor: Network error"
                 )
 
 
 def test_warning_logging_for_no_person_found():
     mock_response = Mock()
     mock_response.status_code = 200
-    mock_response.json.return_value = []
+    mock_response.content = orjson.dumps([])
 
     with patch.dict(os.environ, {"LOG_LEVEL": "WARNING"}):
         setup_logging()
 
         with patch("app.logger") as mock_logger:
-            with patch("requests.get", return_value=mock_response):
+            with patch("app.api_session.get", return_value=mock_response):
                 result = get_shows_from_api_with_cache("Unknown Actor")
 
                 assert result == []
                 mock_logger.warning.assert_called_with(
-                    "No person found for actor: Unknown Actor"
+                    "No person found for actor: %s", "Unknown Actor"
                 )
 
 
 def test_endpoint_logging(client):
     with patch("app.logger") as mock_logger:
-        with patch("app.get_shows_from_api_with_cache") as mock_cache:
-            mock_cache.return_value = [{"tvdbId": "81189"}, {"tvdbId": "73838"}]
+        with patch("app.get_cache_entry") as mock_cache:
+            mock_cache.return_value = new_cache_entry(
+                [{"tvdbId": "81189"}, {"tvdbId": "73838"}]
+            )
 
             response = client.get("/shows/bryan-cranston")
 
             assert response.status_code == 200
             mock_logger.info.assert_any_call(
-                "Request received for actor: bryan-cranston"
+                "Request received for actor: %s", "bryan-cranston"
             )
-            assert any(
-                "Returning" in str(call_args)
-                and "shows for bryan-cranston" in str(call_args)
-                for call_args in mock_logger.info.call_args_list
+            mock_logger.info.assert_any_call(
+                "Returning %d bytes of shows for %s",
+                len(mock_cache.return_value.body),
+                "bryan-cranston",
             )
@@ -1,94 +1,98 @@
-from unittest.mock import patch, Mock
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
 from app import get_shows_from_api, api_session
 import requests
 
-
-def test_retry_on_server_error():
-    """Test that the API handles 5xx errors gracefully"""
-    mock_response = Mock()
-    mock_response.status_code = 500
-    mock_response.reason = "Internal Server Error"
-    mock_response.text = '{"error": "Server Error"}'
-
-    error = requests.HTTPError("500 Server Error")
-    error.response = mock_response
-
-    with patch("app.api_session.get") as mock_get:
-        mock_get.side_effect = error
-
-        result = get_shows_from_api("Test Actor")
-
-        assert result == []
-        assert mock_get.call_count == 1
-
-
-def test_retry_on_rate_limit():
-    """Test that the API handles 429 rate limit errors gracefully"""
-    mock_response = Mock()
-    mock_response.status_code = 429
-    mock_response.reason = "Too Many Requests"
-    mock_response.text = '{"error": "Rate Limited"}'
-
-    error = requests.HTTPError("429 Too Many Requests")
-    error.response = mock_response
-
-    with patch("app.api_session.get") as mock_get:
-        mock_get.side_effect = error
-
-        result = get_shows_from_api("Rate Limited Actor")
-
-        assert result == []
-        assert mock_get.call_count == 1
-
-
-def test_max_retries_exceeded():
-    """Test that we handle persistent errors gracefully"""
-    mock_response = Mock()
-    mock_response.status_code = 500
-    mock_response.reason = "Internal Server Error"
-    mock_response.text = '{"error": "Server Error"}'
-
-    error = requests.HTTPError("500 Server Error")
-    error.response = mock_response
-
-    with patch("app.api_session.get") as mock_get:
-        mock_get.side_effect = error
-
-        result = get_shows_from_api("Always Failing Actor")
-
-        assert result == []
-        assert mock_get.call_count == 1
-
-
-def test_no_retry_on_client_error():
-    """Test that we don't retry on 4xx errors (except 429)"""
-    mock_response_404 = Mock()
-    mock_response_404.status_code = 404
-
-    with patch("app.api_session.get") as mock_get:
-        mock_get.return_value = mock_response_404
-
-        result = get_shows_from_api("Not Found Actor")
-
-        assert mock_get.call_count == 1
-        assert result == []
-
-
-def test_retry_configuration():
+_ADAPTER = api_session.get_adapter("https://api.tvmaze.com")
+
+# Error outcomes are constants, so they are built once and shared by all cases
+_ERR_500 = requests.HTTPError("500 Server Error")
+_ERR_500.response = SimpleNamespace(
+    status_code=500, reason="Internal Server Error", text='{"error": "Server Error"}'
+)
+_ERR_429 = requests.HTTPError("429 Too Many Requests")
+_ERR_429.response = SimpleNamespace(
+    status_code=429, reason="Too Many Requests", text='{"error": "Rate Limited"}'
+)
+_RESP_404 = requests.Response()
+_RESP_404.status_code = 404
+_RESP_404.reason = "Not Found"
+_RESP_404.url = "https://api.tvmaze.com/search/people?q=Not%20Found%20Actor"
+_RESP_404._content = b'{"name":"Not Found","status":404}'
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff(monkeypatch):
+    """Make urllib3 retry backoff sleeps return immediately"""
+    monkeypatch.setattr("urllib3.util.retry.time.sleep", lambda seconds: None)
+
+
+@pytest.fixture(scope="module")
+def retry_config():
+    """Snapshot of the session's retry settings, independent of the adapter"""
+    retry = _ADAPTER.max_retries
+    return (
+        retry.total,
+        retry.backoff_factor,
+        retry.respect_retry_after_header,
+        retry.raise_on_status,
+        frozenset(retry.status_forcelist),
+        frozenset(retry.allowed_methods),
+    )
+
+
+@pytest.mark.parametrize(
+    "outcome,actor_name",
+    [
+        (_ERR_500, "Test Actor"),
+        (_ERR_429, "Rate Limited Actor"),
+        (_ERR_500, "Always Failing Actor"),
+        (_RESP_404, "Not Found Actor"),
+    ],
+    ids=["server_error", "rate_limit", "max_retries_exceeded", "client_error"],
+)
+def test_http_errors_handled_gracefully(monkeypatch, outcome, actor_name):
+    """Test that 5xx, 429 and other 4xx errors are handled gracefully"""
+    mock_get = Mock()
+    if isinstance(outcome, Exception):
+        mock_get.side_effect = outcome
+    else:
+        mock_get.return_value = outcome
+    monkeypatch.setattr(api_session, "get", mock_get)
+    mock_logger = Mock()
+    monkeypatch.setattr("app.logger", mock_logger)
+
+    result = get_shows_from_api(actor_name)
+
+    assert result is None
+    assert mock_get.call_count == 1
+    assert mock_logger.error.call_args[0][:2] == (
+        "HTTP error fetching shows for %s: %s",
+        actor_name,
+    )
+
+
+def test_retry_configuration(retry_config):
     """Test that the retry mechanism is properly configured"""
-    adapter = api_session.get_adapter("https://api.tvmaze.com")
-    retry = adapter.max_retries
-
-    assert retry.total == 3
-    assert 429 in retry.status_forcelist
-    assert 500 in retry.status_forcelist
-    assert 502 in retry.status_forcelist
-    assert 503 in retry.status_forcelist
-    assert 504 in retry.status_forcelist
-    assert retry.backoff_factor == 1
-    assert retry.respect_retry_after_header is True
-    assert retry.raise_on_status is True
-
-    assert "GET" in retry.allowed_methods
-    assert "HEAD" in retry.allowed_methods
-    assert "OPTIONS" in retry.allowed_methods
+    (
+        total,
+        backoff_factor,
+        respect_retry_after,
+        raise_on_status,
+        statuses,
+        methods,
+    ) = retry_config
+
+    assert (total, backoff_factor) == (3, 1)
+    assert respect_retry_after is True
+    assert raise_on_status is True
+    assert {429, 500, 502, 503, 504} <= statuses
+    assert {"GET", "HEAD", "OPTIONS"} <= methods
+
+
+def test_connection_pool_configuration():
+    """Test that the connection pool is sized for concurrent requests"""
+    assert _ADAPTER._pool_connections == 32
+    assert _ADAPTER._pool_maxsize == 100
+    assert _ADAPTER._pool_block is False